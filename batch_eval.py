@@ -0,0 +1,290 @@
+"""Offline batch mode for bulk evaluation of scripted questions through the main.py flow.
+
+Each round writes the next request of every unfinished conversation (tool choice
+or stop_processing finalization) to a Batch API JSONL file with a custom id per
+conversation turn, submits it, polls until the batch finishes, ingests the
+results and advances each conversation by one turn.
+
+    python batch_eval.py corpus.jsonl --work-dir batch_runs --backend local
+
+Corpus lines look like {"id": "q1", "question": "...", "answers": ["..."]}.
+The local backend is a file-based stand-in for the Batch API answered by
+stub_llm.StubLLM, so the whole lifecycle can run without network access.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+
+from conversation import Conversation
+from prompts import PROMPT_VERSION, get_prompts
+from stub_llm import StubLLM
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class LocalBatchBackend:
+    """File-based stand-in for the OpenAI Batch API.
+
+    Batches move through validating -> in_progress -> completed, one step per
+    ``retrieve`` call. Requests are answered by ``responder(body)``.
+    """
+
+    def __init__(self, directory, responder):
+        self.directory = directory
+        self.responder = responder
+        os.makedirs(directory, exist_ok=True)
+
+    def submit(self, input_path):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        file_id = f"file_{batch_id}_input"
+        shutil.copyfile(input_path, self._path(file_id))
+        self._write_batch(
+            {
+                "id": batch_id,
+                "status": "validating",
+                "input_file_id": file_id,
+                "output_file_id": None,
+                "error_file_id": None,
+            }
+        )
+        return batch_id
+
+    def retrieve(self, batch_id):
+        batch = self._read_batch(batch_id)
+        if batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        elif batch["status"] == "in_progress":
+            batch["output_file_id"], batch["error_file_id"] = self._run(batch_id, batch["input_file_id"])
+            batch["status"] = "completed"
+        self._write_batch(batch)
+        return batch
+
+    def download(self, file_id, path):
+        shutil.copyfile(self._path(file_id), path)
+
+    def _run(self, batch_id, input_file_id):
+        # Like the real Batch API, failed requests go to a separate error file and
+        # each file only exists when it has at least one line.
+        results = {"output": [], "error": []}
+        with open(self._path(input_file_id)) as requests:
+            for line in requests:
+                request = json.loads(line)
+                result = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"], "error": None}
+                try:
+                    body = self.responder(request["body"])
+                    result["response"] = {"status_code": 200, "body": body}
+                    results["output"].append(result)
+                except Exception as e:
+                    result["response"] = None
+                    result["error"] = {"code": "stub_error", "message": str(e)}
+                    results["error"].append(result)
+        file_ids = []
+        for kind in ("output", "error"):
+            file_id = None
+            if results[kind]:
+                file_id = f"file_{batch_id}_{kind}"
+                with open(self._path(file_id), "w") as f:
+                    f.writelines(json.dumps(result) + "\n" for result in results[kind])
+            file_ids.append(file_id)
+        return file_ids
+
+    def _path(self, file_id):
+        return os.path.join(self.directory, f"{file_id}.jsonl")
+
+    def _read_batch(self, batch_id):
+        with open(os.path.join(self.directory, f"{batch_id}.json")) as f:
+            return json.load(f)
+
+    def _write_batch(self, batch):
+        with open(os.path.join(self.directory, f"{batch['id']}.json"), "w") as f:
+            json.dump(batch, f)
+
+
+class OpenAIBatchBackend:
+    def __init__(self, client, completion_window="24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, input_path):
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id, endpoint=ENDPOINT, completion_window=self.completion_window
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            "id": batch.id,
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+        }
+
+    def download(self, file_id, path):
+        with open(path, "wb") as f:
+            f.write(self.client.files.content(file_id).read())
+
+
+def load_corpus(path, prompts, max_turns=8):
+    conversations = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            conversations.append(
+                Conversation(item["id"], item["question"], prompts, item.get("answers", []), max_turns)
+            )
+    return conversations
+
+
+def write_batch_file(conversations, path, model="gpt-4o", seed=None):
+    with open(path, "w") as f:
+        for conversation in conversations:
+            custom_id, body = conversation.next_request(model, seed)
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}) + "\n")
+
+
+def ingest_results(conversations, path=None, max_retries=2):
+    """Advance conversations from a batch output file, ``path=None`` meaning the batch had no output.
+
+    Conversations without a usable result are retried in the next round, up to ``max_retries`` times per turn.
+    """
+    by_custom_id = {conversation.custom_id(): conversation for conversation in conversations}
+    answered = set()
+    results = []
+    if path is not None:
+        with open(path) as f:
+            results = [json.loads(line) for line in f if line.strip()]
+    for result in results:
+        conversation = by_custom_id.get(result["custom_id"])
+        if conversation is None:
+            logging.warning(f"Ignoring stale or unknown batch result {result['custom_id']}")
+            continue
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            logging.error(f"Batch request {result['custom_id']} failed: {result.get('error') or response}")
+            continue
+        try:
+            conversation.advance(response["body"]["choices"][0]["message"])
+        except Exception as e:
+            logging.error(f"Could not apply batch result {result['custom_id']}: {e}")
+            continue
+        # The retry budget is per turn.
+        conversation.retries = 0
+        answered.add(conversation.conversation_id)
+    for conversation in conversations:
+        if conversation.conversation_id not in answered:
+            conversation.retries += 1
+            if conversation.retries > max_retries:
+                conversation.fail()
+
+
+async def wait_for_batch(backend, batch_id, poll_seconds):
+    while True:
+        batch = await asyncio.to_thread(backend.retrieve, batch_id)
+        logging.info(f"Batch {batch_id} is {batch['status']}")
+        if batch["status"] in TERMINAL_STATUSES:
+            return batch
+        await asyncio.sleep(poll_seconds)
+
+
+async def run_round(conversations, backend, work_dir, name, model, seed, poll_seconds):
+    input_path = os.path.join(work_dir, f"{name}_input.jsonl")
+    write_batch_file(conversations, input_path, model, seed)
+    batch_id = await asyncio.to_thread(backend.submit, input_path)
+    batch = await wait_for_batch(backend, batch_id, poll_seconds)
+    if batch["status"] != "completed":
+        logging.error(f"Batch {batch_id} ended as {batch['status']}")
+    if batch.get("error_file_id"):
+        error_path = os.path.join(work_dir, f"{name}_errors.jsonl")
+        await asyncio.to_thread(backend.download, batch["error_file_id"], error_path)
+        with open(error_path) as f:
+            for line in f:
+                if line.strip():
+                    error = json.loads(line)
+                    logging.error(f"Batch request {error['custom_id']} failed: {error.get('error') or error.get('response')}")
+    # Expired or cancelled batches can still have partial output, and a batch where
+    # every request failed completes without one. Missing results are retried.
+    output_path = None
+    if batch.get("output_file_id"):
+        output_path = os.path.join(work_dir, f"{name}_output.jsonl")
+        await asyncio.to_thread(backend.download, batch["output_file_id"], output_path)
+    ingest_results(conversations, output_path)
+
+
+async def run_batch_eval(
+    conversations, backend, work_dir, model="gpt-4o", seed=None, poll_seconds=30, max_requests_per_batch=50000
+):
+    """Advance every conversation turn by turn until all of them are done or failed."""
+    os.makedirs(work_dir, exist_ok=True)
+    round_number = 0
+    while True:
+        pending = [conversation for conversation in conversations if not conversation.done]
+        if not pending:
+            break
+        chunks = [pending[i : i + max_requests_per_batch] for i in range(0, len(pending), max_requests_per_batch)]
+        await asyncio.gather(
+            *(
+                run_round(chunk, backend, work_dir, f"round{round_number:03d}_part{part:03d}", model, seed, poll_seconds)
+                for part, chunk in enumerate(chunks)
+            )
+        )
+        round_number += 1
+    return conversations
+
+
+def write_results(conversations, path):
+    with open(path, "w") as f:
+        for conversation in conversations:
+            record = {
+                "id": conversation.conversation_id,
+                "question": conversation.question,
+                "status": conversation.status,
+                "turns": conversation.turn,
+                "tool_calls": conversation.tool_calls,
+                "final_question": conversation.final_question,
+                "knowledge_graph": conversation.knowledge_graph(),
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus")
+    parser.add_argument("--work-dir", default="batch_runs")
+    parser.add_argument("--backend", choices=["local", "openai"], default="local")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--prompt-version", default=PROMPT_VERSION)
+    parser.add_argument("--poll-seconds", type=float, default=None)
+    parser.add_argument("--max-turns", type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler()])
+    if args.backend == "local":
+        backend = LocalBatchBackend(os.path.join(args.work_dir, "local_batches"), StubLLM(args.seed or 0))
+        poll_seconds = 0 if args.poll_seconds is None else args.poll_seconds
+    else:
+        import openai
+
+        backend = OpenAIBatchBackend(openai.OpenAI())
+        poll_seconds = 60 if args.poll_seconds is None else args.poll_seconds
+
+    conversations = load_corpus(args.corpus, get_prompts(args.prompt_version), args.max_turns)
+    asyncio.run(run_batch_eval(conversations, backend, args.work_dir, args.model, args.seed, poll_seconds))
+    results_path = os.path.join(args.work_dir, "results.jsonl")
+    write_results(conversations, results_path)
+    done = sum(conversation.status == "done" for conversation in conversations)
+    logging.info(f"{done}/{len(conversations)} conversations resolved, results written to {results_path}")
+
+
+if __name__ == "__main__":
+    main()
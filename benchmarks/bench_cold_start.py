@@ -0,0 +1,142 @@
+"""Cold-start and per-rerun cost of main.py before and after the prompt registry.
+
+Before is baseline_main.py, a frozen copy of main.py as it was before the
+registry (git show 767ef0a:main.py). It imported numpy and openai at the top and
+re-created the prompt strings, tool schemas and its nested functions on every
+rerun. After is the current main.py, where prompts come from
+prompts.get_prompts() and openai is imported only once a key is set.
+
+Both scripts are measured the same way from their source:
+- cold start: a fresh interpreter importing the script's top-level imports
+  (plus building the registry for main.py);
+- per rerun: executing every literal assignment and undecorated function
+  definition the script runs on a rerun with an API key, plus the registry
+  lookup for main.py;
+- with Streamlit installed, the whole script through streamlit.testing's
+  AppTest, first run in a fresh interpreter and then reruns. Without a key
+  neither script reaches the prompts or the API, so this shows import cost.
+
+Run from the repository root: python benchmarks/bench_cold_start.py
+"""
+import ast
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import prompts
+
+SCRIPTS = {
+    "before": os.path.join(ROOT, "benchmarks", "baseline_main.py"),
+    "after": os.path.join(ROOT, "main.py"),
+}
+SETUP = {"before": "", "after": "import prompts; prompts.get_prompts()"}
+RERUNS = 2000
+APP_RERUNS = 20
+
+
+def fresh_seconds(code, repeat=5):
+    # Fastest of several fresh interpreters, so disk cache noise does not count.
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        runs.append([float(value) for value in result.stdout.split()])
+    return [min(values) for values in zip(*runs)]
+
+
+def top_level_imports(tree):
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules.append(node.module)
+    return modules
+
+
+def installed(module):
+    code = f"import {module}"
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True).returncode == 0
+
+
+def rerun_definitions(tree):
+    """Statements a rerun with an API key executes to define literals and functions."""
+    statements = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, ast.FunctionDef):
+                if not node.decorator_list:  # decorated ones are cached by Streamlit
+                    statements.append(node)
+            elif isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+                try:
+                    ast.literal_eval(node.value)
+                except ValueError:
+                    continue
+                statements.append(node)
+            elif isinstance(node, (ast.If, ast.Try)):
+                visit(node.body)
+                if isinstance(node, ast.Try):
+                    visit(node.finalbody)
+
+    visit(tree.body)
+    return statements
+
+
+def main():
+    trees = {}
+    for label, path in SCRIPTS.items():
+        with open(path) as f:
+            trees[label] = ast.parse(f.read(), path)
+
+    print("cold start (fresh interpreter, top-level imports of the script):")
+    for label, tree in trees.items():
+        modules = top_level_imports(tree)
+        missing = [module for module in modules if not installed(module)]
+        statements = [f"import {module}" for module in modules if module not in missing] + [SETUP[label]]
+        statement = "; ".join(line for line in statements if line)
+        seconds = fresh_seconds(f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)")
+        note = f" (not installed, not counted: {', '.join(missing)})" if missing else ""
+        print(f"  {label:<7} {seconds[0] * 1000:7.1f} ms{note}")
+
+    print("per rerun (literals and nested function definitions):")
+    prompts.get_prompts()
+    for label, tree in trees.items():
+        statements = rerun_definitions(tree)
+        code = compile(ast.Module(body=statements, type_ignores=[]), SCRIPTS[label], "exec")
+        seconds = timeit.timeit(lambda: exec(code, {}), number=RERUNS) / RERUNS
+        if label == "after":
+            seconds += timeit.timeit(prompts.get_prompts, number=RERUNS) / RERUNS
+        names = [node.name if isinstance(node, ast.FunctionDef) else node.targets[0].id for node in statements]
+        print(f"  {label:<7} {seconds * 1e6:7.1f} us  {', '.join(names)}")
+    build = timeit.timeit(prompts._build_v3, number=20) / 20
+    print(f"one-time registry build (validation + token counts): {build * 1000:.2f} ms")
+
+    if not installed("streamlit"):
+        print("whole script: streamlit is not installed, skipped")
+        return
+    print(f"whole script (AppTest, no API key; first run, then mean of {APP_RERUNS} reruns):")
+    for label, path in SCRIPTS.items():
+        code = (
+            "import time; start = time.perf_counter()\n"
+            "from streamlit.testing.v1 import AppTest\n"
+            f"app = AppTest.from_file({path!r}, default_timeout=60)\n"
+            "app.run(); first = time.perf_counter() - start\n"
+            "start = time.perf_counter()\n"
+            f"for _ in range({APP_RERUNS}): app.run()\n"
+            f"print(first, (time.perf_counter() - start) / {APP_RERUNS})"
+        )
+        seconds = fresh_seconds(code, repeat=3)
+        if seconds is None:
+            print(f"  {label:<7} failed to run")
+            continue
+        print(f"  {label:<7} first run {seconds[0] * 1000:7.1f} ms  rerun {seconds[1] * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory benchmark for SessionStore at 10, 100 and 1000 concurrent sessions.
+
+Run from the repository root: python benchmarks/bench_session_store.py
+"""
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import SessionStore
+
+SYSTEM_PROMPT = "You are an AI chat assistant who is an expert in the finance domain. " * 80
+KG_PROMPT = "\n        This is the current knowledge graph to use:\n        knowledge_graph:{knowledge_graph}\n        "
+QUESTIONS = [
+    "What was the budget variance for major appliances in 2023?",
+    "Show me revenue by company region for Q2.",
+    "Which cost centers had the highest travel expenses?",
+]
+ANSWERS = ["Product group", "Fiscal year 2023", "Company region", "Other"]
+
+
+def copy_str(value):
+    # User replies and parsed tool arguments are new strings in every session.
+    return "".join(list(value))
+
+
+def new_session(rng):
+    messages = [
+        # Prompt literals are shared: Streamlit caches the script's compiled bytecode.
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": KG_PROMPT.format(knowledge_graph={})},
+    ]
+    for _ in range(rng.randint(2, 6)):
+        messages.append({"role": "assistant", "content": "What can I help with today?"})
+        messages.append({"role": "user", "content": copy_str(rng.choice(QUESTIONS + ANSWERS))})
+    return {
+        "knowledge_graph": {},
+        "messages": messages,
+        "waiting_for_input": True,
+        "current_question": "What can I help with today?",
+        "conversation_ended": False,
+        "follow_up_options": [copy_str(answer) for answer in ANSWERS],
+    }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def baseline(sessions):
+    rng = random.Random(0)
+    return [new_session(rng) for _ in range(sessions)]
+
+
+def with_store(sessions, max_hot_sessions, log_dir):
+    def build():
+        rng = random.Random(0)
+        store = SessionStore(os.path.join(log_dir, f"sessions_{sessions}_{max_hot_sessions}.jsonl"), max_hot_sessions)
+        store.share({"role": "system", "content": SYSTEM_PROMPT})
+        store.share({"role": "user", "content": KG_PROMPT.format(knowledge_graph={})})
+        for i in range(sessions):
+            store.checkout(f"session-{i}", lambda: new_session(rng))
+            store.checkin(f"session-{i}")
+        return store
+
+    return build
+
+
+def main():
+    with tempfile.TemporaryDirectory() as log_dir:
+        print(f"{'sessions':>8} {'baseline KiB':>13} {'store KiB':>10} {'store+spill KiB':>16}")
+        for sessions in (10, 100, 1000):
+            base = measure(lambda: baseline(sessions))
+            hot = measure(with_store(sessions, sessions, log_dir))
+            spill = measure(with_store(sessions, 10, log_dir))
+            print(f"{sessions:>8} {base / 1024:>13.1f} {hot / 1024:>10.1f} {spill / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
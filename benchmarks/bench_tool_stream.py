@@ -0,0 +1,57 @@
+"""Time to first visible follow-up question, streamed tool arguments vs waiting for full JSON.
+
+Replays a synthetic ask_for_followup tool call as ~4 character deltas at a fixed
+token rate. Run from the repository root: python benchmarks/bench_tool_stream.py
+"""
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool_stream import ToolCallAccumulator
+
+ARGUMENTS = {
+    "messages": [{"role": "", "content": ""}],
+    "assistant_question": "When you say 'major appliances', do you mean the product group or a specific product name?",
+    "options": [
+        "Product group 'Major Appliances'",
+        "Product name 'Major Appliances'",
+        "A list of specific products you will provide",
+        "All products with 'appliance' in the product group name",
+    ],
+}
+CHUNK_SIZE = 4
+SECONDS_PER_CHUNK = 0.02
+
+
+def stream():
+    text = json.dumps(ARGUMENTS)
+    for i in range(0, len(text), CHUNK_SIZE):
+        time.sleep(SECONDS_PER_CHUNK)
+        function = SimpleNamespace(name="ask_for_followup" if i == 0 else None, arguments=text[i : i + CHUNK_SIZE])
+        yield SimpleNamespace(index=0, id="call_0" if i == 0 else None, function=function)
+
+
+def time_to_first_visible(streaming):
+    start = time.perf_counter()
+    accumulator = ToolCallAccumulator()
+    for delta in stream():
+        (call,) = accumulator.add([delta])
+        if streaming and call.partial_arguments().get("assistant_question"):
+            return time.perf_counter() - start
+    call.arguments_json()
+    return time.perf_counter() - start
+
+
+def main():
+    streamed = time_to_first_visible(streaming=True)
+    waited = time_to_first_visible(streaming=False)
+    print(f"time to first visible content, streamed arguments: {streamed:.3f}s")
+    print(f"time to first visible content, full arguments:     {waited:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""A/B comparison of the three assistant variants on the same question corpus.
+
+Every corpus question is run through each variant's prompts and tool definitions
+with the conversation flow from conversation.py. The LLM is either the
+deterministic stub_llm.StubLLM or real completions cached on disk, so reruns are
+reproducible. Reports turns to resolution, prompt and completion tokens, p50/p95
+latency per question and agreement of the final question with a reference
+variant, as a CSV and as a summary table.
+
+Each variant keeps its own behavior: only the tools it offers are called, the
+older variants act on the first tool call only and neither offers options nor
+keeps a knowledge graph. Stub mode still decides when to stop the same way for
+every variant, so its turns and agreement mostly reflect those behavioral
+differences; use cached real completions to compare answer quality.
+
+    python compare_variants.py corpus.jsonl --llm stub --seed 0 --output comparison.csv
+"""
+import argparse
+import csv
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import statistics
+import time
+
+from batch_eval import load_corpus
+from prompts import get_prompts
+from stub_llm import StubLLM
+
+VARIANTS = {
+    "main_old": "v1",
+    "main_disambiguation_options": "v2",
+    "main": "v3",
+}
+
+
+class StubCompletions:
+    """StubLLM with a fixed latency model, so latency only reflects token volume."""
+
+    def __init__(self, seed, seconds_per_request=0.4, seconds_per_prompt_token=0.0001, seconds_per_completion_token=0.02):
+        self.llm = StubLLM(seed)
+        self.seconds_per_request = seconds_per_request
+        self.seconds_per_prompt_token = seconds_per_prompt_token
+        self.seconds_per_completion_token = seconds_per_completion_token
+
+    def __call__(self, body):
+        response = self.llm(body)
+        usage = response["usage"]
+        latency = (
+            self.seconds_per_request
+            + usage["prompt_tokens"] * self.seconds_per_prompt_token
+            + usage["completion_tokens"] * self.seconds_per_completion_token
+        )
+        return response, latency
+
+
+class CachedCompletions:
+    """Chat completions cached on disk by request body, replaying the recorded latency on hits.
+
+    With no client, a cache miss raises KeyError so offline runs never reach the API.
+    """
+
+    def __init__(self, cache_dir, client=None):
+        self.cache_dir = cache_dir
+        self.client = client
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __call__(self, body):
+        key = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                cached = json.load(f)
+            return cached["response"], cached["latency"]
+        if self.client is None:
+            raise KeyError(f"No cached completion for request {key}")
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(**body).model_dump()
+        latency = time.perf_counter() - start
+        with open(path, "w") as f:
+            json.dump({"response": response, "latency": latency}, f)
+        return response, latency
+
+
+def run_conversation(conversation, complete, model, seed):
+    row = {
+        "id": conversation.conversation_id,
+        "status": "",
+        "turns": 0,
+        "requests": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "latency_s": 0.0,
+    }
+    while not conversation.done:
+        _, body = conversation.next_request(model, seed)
+        try:
+            response, latency = complete(body)
+        except Exception as e:
+            logging.error(f"Request for {conversation.custom_id()} failed: {e}")
+            conversation.fail()
+            break
+        usage = response.get("usage") or {}
+        row["requests"] += 1
+        row["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        row["completion_tokens"] += usage.get("completion_tokens", 0)
+        row["latency_s"] += latency
+        try:
+            conversation.advance(response["choices"][0]["message"])
+        except Exception as e:
+            # A retry would replay the same cached or stubbed reply, so the question fails.
+            logging.error(f"Could not apply reply to {conversation.custom_id()}: {e}")
+            conversation.fail()
+    row.update(
+        status=conversation.status,
+        turns=conversation.turn,
+        latency_s=round(row["latency_s"], 3),
+        final_question=conversation.final_question or "",
+    )
+    return row
+
+
+def normalize_question(text):
+    text = re.sub(r"^\W*question:\s*", "", (text or "").strip().strip('"').lower())
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def add_agreement(rows, reference):
+    reference_questions = {
+        row["id"]: normalize_question(row["final_question"]) for row in rows if row["variant"] == reference
+    }
+    for row in rows:
+        question = normalize_question(row["final_question"])
+        expected = reference_questions.get(row["id"], "")
+        row["agrees_with_reference"] = int(bool(question) and question == expected)
+        similarity = difflib.SequenceMatcher(None, question, expected).ratio() if question and expected else 0.0
+        row["similarity_to_reference"] = round(similarity, 3)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[round(fraction * 100) - 1]
+
+
+def summarize(rows):
+    summary = []
+    for variant in VARIANTS:
+        variant_rows = [row for row in rows if row["variant"] == variant]
+        resolved = [row for row in variant_rows if row["status"] == "done"]
+        latencies = sorted(row["latency_s"] for row in resolved)
+        per_resolved = max(len(resolved), 1)
+        summary.append(
+            {
+                "variant": variant,
+                "questions": len(variant_rows),
+                "resolved": len(resolved),
+                "mean_turns": round(sum(row["turns"] for row in resolved) / per_resolved, 2),
+                "prompt_tokens_per_resolved": round(sum(row["prompt_tokens"] for row in variant_rows) / per_resolved),
+                "completion_tokens_per_resolved": round(
+                    sum(row["completion_tokens"] for row in variant_rows) / per_resolved
+                ),
+                "p50_latency_s": round(percentile(latencies, 0.50), 3),
+                "p95_latency_s": round(percentile(latencies, 0.95), 3),
+                "agreement": round(sum(row["agrees_with_reference"] for row in variant_rows) / max(len(variant_rows), 1), 3),
+                "similarity": round(
+                    sum(row["similarity_to_reference"] for row in variant_rows) / max(len(variant_rows), 1), 3
+                ),
+            }
+        )
+    return summary
+
+
+def format_table(summary):
+    columns = list(summary[0])
+    cells = [[str(row[column]) for column in columns] for row in summary]
+    widths = [max(len(column), *(len(row[i]) for row in cells)) for i, column in enumerate(columns)]
+    lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+    lines.append("  ".join("-" * width for width in widths))
+    lines += ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in cells]
+    return "\n".join(lines)
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def compare(corpus_path, complete, model="gpt-4o", seed=0, max_turns=8, reference="main"):
+    rows = []
+    for variant, version in VARIANTS.items():
+        for conversation in load_corpus(corpus_path, get_prompts(version), max_turns):
+            row = run_conversation(conversation, complete, model, seed)
+            rows.append({"variant": variant, "prompt_version": version, **row})
+    add_agreement(rows, reference)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus")
+    parser.add_argument("--llm", choices=["stub", "cached"], default="stub")
+    parser.add_argument("--cache-dir", default="llm_cache")
+    parser.add_argument("--offline", action="store_true", help="only replay cached completions")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=8)
+    parser.add_argument("--reference", choices=list(VARIANTS), default="main")
+    parser.add_argument("--output", default="comparison.csv")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+    if args.llm == "stub":
+        complete = StubCompletions(args.seed)
+    else:
+        client = None
+        if not args.offline:
+            import openai
+
+            client = openai.OpenAI()
+        complete = CachedCompletions(args.cache_dir, client)
+
+    rows = compare(args.corpus, complete, args.model, args.seed, args.max_turns, args.reference)
+    write_csv(rows, args.output)
+    summary = summarize(rows)
+    summary_path = os.path.splitext(args.output)[0] + "_summary.csv"
+    write_csv(summary, summary_path)
+    print(format_table(summary))
+    print(f"\nPer-question results: {args.output}\nSummary: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
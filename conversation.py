@@ -0,0 +1,135 @@
+"""Scripted, UI-free version of the main.py conversation flow.
+
+A Conversation produces the next chat completion request body and advances on
+the assistant message that comes back, with the same tool handling as main.py.
+Follow-up questions are answered from a scripted list of answers, falling back
+to the first offered option. Used for offline evaluation runs.
+
+Behavior follows the prompt version's own script: older variants only act on
+the first tool call, never offer options and keep no knowledge graph.
+"""
+import json
+import logging
+
+import kg_channel
+
+FIRST_QUESTION = "What can I help with today?"
+FALLBACK_ANSWER = "I am not sure, please use your best judgement."
+
+
+class Conversation:
+    def __init__(self, conversation_id, question, prompts, answers=(), max_turns=8):
+        self.conversation_id = conversation_id
+        self.question = question
+        self.prompts = prompts
+        self.answers = list(answers)
+        self.max_turns = max_turns
+        self.state = {}
+        kg_channel.init_state(self.state)
+        kg_channel.start_conversation(self.state)
+        # The UI always opens with ask_user, so start from the user's answer to it.
+        self.messages = prompts.initial_messages() + [
+            {"role": "assistant", "content": FIRST_QUESTION},
+            {"role": "user", "content": question},
+        ]
+        self.status = "tool_choice"
+        self.turn = 0
+        self.final_question = None
+        self.tool_calls = []
+        self.retries = 0
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def custom_id(self):
+        return f"{self.conversation_id}:{self.turn}:{self.status}"
+
+    def next_request(self, model="gpt-4o", seed=None):
+        if self.status == "tool_choice":
+            self._append_kg_delta()
+            body = {
+                "model": model,
+                "messages": self.messages,
+                "tools": self.prompts.tools,
+                "tool_choice": "required",
+            }
+        elif self.status == "finalize":
+            body = {"model": model, "messages": self.messages}
+        else:
+            raise ValueError(f"Conversation {self.conversation_id} is already {self.status}")
+        if seed is not None:
+            body["seed"] = seed
+        return self.custom_id(), body
+
+    def advance(self, message):
+        """Apply an assistant message (a chat completion ``choices[0].message`` dict)."""
+        if self.status == "finalize":
+            self.final_question = json.dumps(message.get("content"), indent=2)
+            self.messages.append({"role": "assistant", "content": self.final_question})
+            self.status = "done"
+            return
+
+        # Parse every call before changing any state, so a malformed reply leaves the turn retryable.
+        tool_calls = message.get("tool_calls") or []
+        if not self.prompts.handles_parallel_tool_calls:
+            tool_calls = tool_calls[:1]
+        parsed = []
+        for call in tool_calls:
+            arguments = call["function"].get("arguments")
+            params = json.loads(arguments) if arguments else {}
+            if not isinstance(params, dict):
+                raise ValueError(f"Arguments of {call['function']['name']} are not an object: {arguments}")
+            parsed.append((call["function"]["name"], params))
+        self.tool_calls.extend(name for name, _ in parsed)
+        self.turn += 1
+
+        # As in main.py, every knowledge graph update applies and otherwise the first call of a tool wins.
+        results = {}
+        for name, params in parsed:
+            results.setdefault(name, params)
+            if name in ("update_knowledge_graph", "stop_processing") and self.prompts.tool_accepts(
+                name, "knowledge_pieces"
+            ):
+                self._update_knowledge_graph(params.get("knowledge_pieces", []))
+        if "stop_processing" in results:
+            self._append_kg_delta()
+            self.messages.append(self.prompts.finalize_message)
+            self.status = "finalize"
+            return
+        if self.turn >= self.max_turns:
+            self.status = "failed"
+            return
+        if "ask_for_followup" in results:
+            question = results["ask_for_followup"].get("assistant_question", FIRST_QUESTION)
+            options = []
+            if self.prompts.tool_accepts("ask_for_followup", "options"):
+                options = results["ask_for_followup"].get("options") or []
+        else:
+            question, options = FIRST_QUESTION, []
+        self.messages.append({"role": "assistant", "content": question})
+        self.messages.append({"role": "user", "content": self._answer(options)})
+
+    def fail(self):
+        self.status = "failed"
+
+    def knowledge_graph(self):
+        return dict(self.state["knowledge_graph"])
+
+    def _answer(self, options):
+        if self.answers:
+            return self.answers.pop(0)
+        if options:
+            return options[0]
+        return FALLBACK_ANSWER
+
+    def _update_knowledge_graph(self, knowledge_pieces):
+        # Malformed pieces are logged and skipped, as in main.py's update_knowledge_graph.
+        try:
+            kg_channel.update(self.state, knowledge_pieces)
+        except Exception as e:
+            logging.error(f"Error updating knowledge graph of {self.conversation_id}: {e}")
+
+    def _append_kg_delta(self):
+        if self.prompts.knowledge_graph_update_message is not None:
+            kg_channel.append_pending_delta(self.state, self.messages, self.prompts.knowledge_graph_update_message)
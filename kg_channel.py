@@ -0,0 +1,95 @@
+"""Knowledge graph prompt channel.
+
+Every conversation starts from the same prompt prefix (the system prompt and
+the knowledge graph message for an empty graph), so it stays byte-identical
+and provider-side prompt caching can hit. Knowledge graph entries then reach
+the conversation as delta messages holding only what changed since the
+version last sent to it, including pieces learned mid-conversation.
+
+All state lives in the plain per-session state dict so it can be spilled by
+the session store.
+"""
+import json
+import logging
+
+
+def init_state(state):
+    state.setdefault("knowledge_graph", {})
+    state.setdefault("kg_version", 0)
+    state.setdefault("kg_changes", {})  # jargon -> version it last changed at
+    state.setdefault("kg_sent_version", 0)
+    state.setdefault(
+        "prompt_metrics",
+        {"turns": 0, "prompt_bytes": 0, "new_prompt_bytes": 0, "prompt_tokens": 0, "cached_tokens": 0},
+    )
+
+
+def update(state, knowledge_pieces):
+    changed = [
+        piece for piece in knowledge_pieces if state["knowledge_graph"].get(piece["jargon"]) != piece["value"]
+    ]
+    if not changed:
+        return
+    state["kg_version"] += 1
+    for piece in changed:
+        state["knowledge_graph"][piece["jargon"]] = piece["value"]
+        state["kg_changes"][piece["jargon"]] = state["kg_version"]
+
+
+def reset(state):
+    state["kg_version"] += 1
+    for jargon in state["knowledge_graph"]:
+        state["kg_changes"][jargon] = state["kg_version"]
+    state["knowledge_graph"] = {}
+
+
+def start_conversation(state):
+    state["kg_sent_version"] = 0
+    state["prompt_metrics"]["last_prompt_bytes"] = 0
+
+
+def append_pending_delta(state, messages, template):
+    """Append a message with knowledge graph changes the conversation has not seen yet."""
+    since = state["kg_sent_version"]
+    updates = {
+        jargon: state["knowledge_graph"].get(jargon)
+        for jargon, version in state["kg_changes"].items()
+        if version > since and (since > 0 or jargon in state["knowledge_graph"])
+    }
+    state["kg_sent_version"] = state["kg_version"]
+    if not updates:
+        return
+    messages.append(
+        {
+            "role": template["role"],
+            "content": template["content"].format(
+                since_version=since, version=state["kg_version"], updates=updates
+            ),
+        }
+    )
+
+
+def record_prompt(state, messages, usage=None):
+    """Track prompt bytes per turn and, when the provider reports it, the prompt cache hit rate."""
+    metrics = state["prompt_metrics"]
+    prompt_bytes = len(json.dumps(messages).encode("utf-8"))
+    new_bytes = prompt_bytes - metrics.get("last_prompt_bytes", 0)
+    metrics["turns"] += 1
+    metrics["prompt_bytes"] += prompt_bytes
+    metrics["new_prompt_bytes"] += new_bytes
+    metrics["last_prompt_bytes"] = prompt_bytes
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        metrics["prompt_tokens"] += usage.prompt_tokens
+        metrics["cached_tokens"] += getattr(details, "cached_tokens", None) or 0
+    logging.info(
+        f"Prompt turn {metrics['turns']}: {prompt_bytes} bytes ({new_bytes} new), "
+        f"cache hit rate {cache_hit_rate(state):.1%}"
+    )
+
+
+def cache_hit_rate(state):
+    metrics = state["prompt_metrics"]
+    if not metrics["prompt_tokens"]:
+        return 0.0
+    return metrics["cached_tokens"] / metrics["prompt_tokens"]
@@ -0,0 +1,188 @@
+import atexit
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def _create_private(path):
+    """Create or truncate ``path`` readable only by the owner and return the open descriptor."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)
+    return fd
+
+
+class SessionStore:
+    """Process-wide store for per-session chat state.
+
+    Hot sessions live in memory with interned message strings and shared
+    system prompts. Sessions idle for longer than ``idle_seconds`` (or the
+    least recently used ones beyond ``max_hot_sessions``) are appended to an
+    on-disk log and restored lazily the next time they are checked out.
+    A session is never spilled between ``checkout`` and ``checkin``.
+
+    ``is_active(session_id)`` reports whether a session still exists. Idle
+    sessions that no longer do are discarded instead of spilled, and the log
+    is rewritten once most of it is records of discarded or restored sessions.
+
+    The log holds user conversations. Without ``log_path`` it is a private
+    temporary file of this process, removed at exit.
+    """
+
+    def __init__(
+        self, log_path=None, max_hot_sessions=100, idle_seconds=600, is_active=None, compact_min_bytes=1024 * 1024
+    ):
+        self.log_path = log_path
+        self.max_hot_sessions = max_hot_sessions
+        self.idle_seconds = idle_seconds
+        self.is_active = is_active or (lambda session_id: True)
+        self.compact_min_bytes = compact_min_bytes
+        self._hot = OrderedDict()  # session_id -> [state, last_access, checkouts in progress]
+        self._offsets = {}  # session_id -> (byte offset, length) of latest spilled record
+        self._log_bytes = 0
+        self._shared = {}  # (role, content) -> canonical message dict
+        self._lock = threading.Lock()
+        if log_path is None:
+            fd, self.log_path = tempfile.mkstemp(prefix="streamlit_demos_sessions_", suffix=".jsonl")
+            atexit.register(self._remove_log)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            # Start from an empty log, spilled state does not outlive the process.
+            fd = _create_private(log_path)
+        os.close(fd)
+
+    def share(self, message):
+        """Register a message (e.g. a system prompt) to be stored once for all sessions."""
+        key = (message["role"], message["content"])
+        with self._lock:
+            if key not in self._shared:
+                self._intern_in_place(message)
+                self._shared[key] = message
+            return self._shared[key]
+
+    def checkout(self, session_id, factory):
+        """Return the live state dict for a session, creating it with ``factory`` if needed."""
+        now = time.monotonic()
+        with self._lock:
+            if session_id in self._hot:
+                entry = self._hot.pop(session_id)
+            else:
+                state = self._restore(session_id) if session_id in self._offsets else None
+                entry = [factory() if state is None else state, now, 0]
+            self._compact(entry[0])
+            entry[1] = now
+            entry[2] += 1
+            self._hot[session_id] = entry
+            self._evict(now)
+        return entry[0]
+
+    def checkin(self, session_id):
+        """Mark the end of a rerun, the session may be spilled again once idle."""
+        with self._lock:
+            entry = self._hot.get(session_id)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                entry[2] = max(entry[2] - 1, 0)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._hot.pop(session_id, None)
+            self._offsets.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hot_sessions": len(self._hot),
+                "spilled_sessions": len(self._offsets),
+                "shared_messages": len(self._shared),
+                "log_bytes": self._log_bytes,
+            }
+
+    def _intern_in_place(self, message):
+        for key, value in message.items():
+            if isinstance(value, str):
+                message[key] = sys.intern(value)
+
+    def _compact(self, state):
+        messages = state.get("messages")
+        if not messages:
+            return
+        for i, message in enumerate(messages):
+            shared = self._shared.get((message.get("role"), message.get("content")))
+            if shared is not None:
+                messages[i] = shared
+            else:
+                self._intern_in_place(message)
+
+    def _evict(self, now):
+        # Sessions in the middle of a rerun are still being written to, never spill those.
+        released = [session_id for session_id, entry in self._hot.items() if entry[2] == 0]
+        idle = [session_id for session_id in released if now - self._hot[session_id][1] > self.idle_seconds]
+        for session_id in idle:
+            state = self._hot.pop(session_id)[0]
+            if self.is_active(session_id):
+                self._spill(session_id, state)
+            else:
+                logging.info(f"Discarded ended session {session_id}")
+        overflow = len(self._hot) - self.max_hot_sessions
+        if overflow > 0:
+            # OrderedDict keeps least recently checked out sessions first.
+            idle = set(idle)
+            for session_id in [session_id for session_id in released if session_id not in idle][:overflow]:
+                self._spill(session_id, self._hot.pop(session_id)[0])
+        if idle:
+            for session_id in [session_id for session_id in self._offsets if not self.is_active(session_id)]:
+                del self._offsets[session_id]
+        self._maybe_compact_log()
+
+    def _spill(self, session_id, state):
+        record = json.dumps({"session_id": session_id, "state": state}, separators=(",", ":")).encode("utf-8")
+        with open(self.log_path, "ab") as log:
+            offset = log.tell()
+            log.write(record + b"\n")
+        self._offsets[session_id] = (offset, len(record) + 1)
+        self._log_bytes = offset + len(record) + 1
+        logging.info(f"Spilled idle session {session_id} to {self.log_path}")
+
+    def _restore(self, session_id):
+        offset, length = self._offsets.pop(session_id)
+        with open(self.log_path, "rb") as log:
+            log.seek(offset)
+            line = log.read(length)
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = {}
+        if record.get("session_id") != session_id:
+            # Never hand out another session's record, start this one over instead.
+            logging.error(f"Spilled record of session {session_id} in {self.log_path} is missing or corrupt")
+            return None
+        logging.info(f"Restored session {session_id} from {self.log_path}")
+        return record["state"]
+
+    def _maybe_compact_log(self):
+        live_bytes = sum(length for _, length in self._offsets.values())
+        if self._log_bytes < self.compact_min_bytes or self._log_bytes < 2 * live_bytes:
+            return
+        compacted_path = self.log_path + ".compact"
+        offsets = {}
+        with open(self.log_path, "rb") as log, open(_create_private(compacted_path), "wb") as compacted:
+            for session_id, (offset, length) in self._offsets.items():
+                log.seek(offset)
+                offsets[session_id] = (compacted.tell(), length)
+                compacted.write(log.read(length))
+        os.replace(compacted_path, self.log_path)
+        logging.info(f"Compacted {self.log_path} from {self._log_bytes} to {live_bytes} bytes")
+        self._offsets = offsets
+        self._log_bytes = live_bytes
+
+    def _remove_log(self):
+        for path in (self.log_path, self.log_path + ".compact"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
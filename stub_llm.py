@@ -0,0 +1,98 @@
+"""Deterministic stand-in for the chat completions endpoint, for offline runs.
+
+Given a request body it returns a chat completion response body. Tool-choice
+requests get one or two ask_for_followup calls before stop_processing, and
+finalization requests get a "Question: ..." built from the conversation. The
+number of follow-ups depends only on the seed and the user's question.
+
+Calls are built from the tools offered in the request: arguments a tool's
+schema does not declare (e.g. options or knowledge_pieces for the older
+variants) are left out, and update_knowledge_graph is only called alongside a
+follow-up when it is offered.
+"""
+import json
+import random
+import zlib
+
+from prompts import count_tokens
+
+
+class StubLLM:
+    def __init__(self, seed=0, max_followups=2):
+        self.seed = seed
+        self.max_followups = max_followups
+
+    def __call__(self, body):
+        messages = body["messages"]
+        user_turns = self._user_replies(messages)
+        question = user_turns[0] if user_turns else ""
+        rng = random.Random(zlib.crc32(f"{self.seed}:{question}".encode("utf-8")))
+        followups = rng.randint(1, self.max_followups)
+
+        if "tools" not in body:
+            clarifications = "; ".join(user_turns[1:])
+            message = {"role": "assistant", "content": f"Question: {question} ({clarifications})"}
+        elif len(user_turns) <= followups:
+            calls = [
+                (
+                    "ask_for_followup",
+                    {
+                        "messages": [{"role": "", "content": ""}],
+                        "assistant_question": f"Which dimension does '{self._jargon(question, len(user_turns))}' refer to?",
+                        "options": ["product name", "product group name", "profit center name"],
+                    },
+                )
+            ]
+            if len(user_turns) > 1:
+                pieces = [{"jargon": self._jargon(question, len(user_turns) - 1), "value": user_turns[-1]}]
+                calls.append(("update_knowledge_graph", {"knowledge_pieces": pieces}))
+            message = self._tool_message(body, calls)
+        else:
+            pieces = [{"jargon": self._jargon(question, 1), "value": user_turns[-1]}]
+            message = self._tool_message(
+                body, [("stop_processing", {"messages": [{"role": "", "content": ""}], "knowledge_pieces": pieces})]
+            )
+
+        prompt_tokens = count_tokens(json.dumps(messages)) + count_tokens(json.dumps(body.get("tools", [])))
+        completion_tokens = count_tokens(json.dumps(message))
+        return {
+            "id": f"chatcmpl-stub-{zlib.crc32(json.dumps(messages).encode('utf-8')):08x}",
+            "object": "chat.completion",
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if "tools" in body else "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _user_replies(self, messages):
+        # The user's own turns are the messages that directly follow an assistant turn.
+        return [
+            messages[i + 1]["content"]
+            for i, message in enumerate(messages[:-1])
+            if message["role"] == "assistant" and messages[i + 1]["role"] == "user"
+        ]
+
+    def _jargon(self, question, index):
+        words = [word.strip("?.,'\"") for word in question.split() if len(word) > 4]
+        return words[index % len(words)] if words else question
+
+    def _tool_message(self, body, calls):
+        offered = {tool["function"]["name"]: tool["function"] for tool in body["tools"]}
+        call_id = f"call_{zlib.crc32(json.dumps(body['messages']).encode('utf-8')):08x}"
+        tool_calls = []
+        for name, arguments in calls:
+            if name not in offered:
+                continue
+            properties = offered[name].get("parameters", {}).get("properties", {})
+            arguments = {key: value for key, value in arguments.items() if key in properties}
+            tool_calls.append(
+                {
+                    "id": f"{call_id}_{len(tool_calls)}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)},
+                }
+            )
+        return {"role": "assistant", "content": None, "tool_calls": tool_calls}
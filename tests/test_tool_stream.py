@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool_stream import PartialJSONParser, StreamedToolCall, dedupe_tool_calls
+
+DOCUMENTS = [
+    {"assistant_question": "Which file under C:\\users\\finance should I use?"},
+    {"assistant_question": "Escapes: \" \\ / \b \f \n \r \t \\u0041 done"},
+    {"assistant_question": "Caf\u00e9 \u2013 \u00fcber \U0001F4B0 budget", "options": ["\u00e9", "\\u"]},
+    {"knowledge_pieces": [{"jargon": "MDA", "value": "major appliances"}, {"jargon": "pc", "value": ""}]},
+    {"nested": {"a": [1, -2.5, 3e2, [], {}], "b": {"c": [True, False, None]}}, "empty": ""},
+    [{"x": [[["deep"]]]}, "tail"],
+]
+
+
+def encodings(document):
+    yield json.dumps(document)
+    yield json.dumps(document, ensure_ascii=False)
+    yield json.dumps(document, indent=2)
+
+
+def streamed(text, size):
+    parser = PartialJSONParser()
+    for start in range(0, len(text), size):
+        parser.feed(text[start : start + size])
+        # Every intermediate value must be readable, whatever the chunk boundary.
+        json.dumps(parser.value)
+    return parser.value
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+def test_chunked_feed_matches_json_loads(document, size):
+    for text in encodings(document):
+        assert streamed(text, size) == json.loads(text)
+
+
+def test_partial_string_is_truncated_before_incomplete_escape():
+    parser = PartialJSONParser()
+    parser.feed('{"q": "C:\\\\users\\\\u')
+    assert parser.value == {"q": "C:\\users\\u"}
+    parser = PartialJSONParser()
+    parser.feed('{"q": "price \\u20')
+    assert parser.value == {"q": "price "}
+    parser.feed("ac")
+    assert parser.value == {"q": "price \u20ac"}
+
+
+def test_partial_string_drops_unpaired_high_surrogate():
+    parser = PartialJSONParser()
+    parser.feed('{"q": "cash \\ud83d')
+    assert parser.value == {"q": "cash "}
+    parser.feed('\\udcb0"}')
+    assert parser.value == {"q": "cash \U0001F4B0"}
+
+
+def test_streamed_tool_call_never_raises_on_partial_arguments():
+    text = json.dumps({"assistant_question": "Which file under C:\\users\\finance?", "options": ["a"]})
+    call = StreamedToolCall(0)
+    for char in text:
+        call.feed(char)
+        assert isinstance(call.partial_arguments(), dict)
+    assert call.arguments_json() == json.loads(text)
+
+
+def test_streamed_tool_call_with_malformed_arguments():
+    call = StreamedToolCall(0)
+    call.feed('{"q": "bad \\x escape"}')
+    assert call.partial_arguments() == {}
+    with pytest.raises(json.JSONDecodeError):
+        call.arguments_json()
+
+
+def test_dedupe_keeps_first_call_and_every_knowledge_graph_update():
+    calls = []
+    for index, name in enumerate(["ask_for_followup", "update_knowledge_graph", "ask_for_followup", "update_knowledge_graph"]):
+        call = StreamedToolCall(index)
+        call.name = name
+        calls.append(call)
+    assert [call.index for call in dedupe_tool_calls(calls)] == [0, 1, 3]
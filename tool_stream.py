@@ -0,0 +1,188 @@
+import json
+import logging
+
+_WHITESPACE = " \t\r\n"
+
+
+class PartialJSONParser:
+    """Incremental JSON parser that exposes a best-effort value while input is still arriving.
+
+    Each call to ``feed`` only scans the new characters. ``value`` returns the
+    document parsed so far: open objects and arrays are returned as they are,
+    a string that is still streaming is returned truncated, and numbers or
+    literals only appear once they are complete.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._stack = []  # [container, pending dict key]
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._unicode_digits = 0  # hex digits still expected for a \uXXXX escape
+        self._escape_start = 0  # position in _raw of the escape being read
+        self._raw = []
+        self._slot = None  # (container, key or index) receiving the current string value
+        self._literal = []
+
+    def feed(self, text):
+        for char in text:
+            if self._in_string:
+                self._feed_string(char)
+            elif self._literal and char not in ",}]" + _WHITESPACE:
+                self._literal.append(char)
+            else:
+                if self._literal:
+                    self._end_literal()
+                self._feed_value(char)
+
+    @property
+    def value(self):
+        if self._in_string and self._slot is not None:
+            container, key = self._slot
+            container[key] = self._decode(partial=True)
+        return self._root
+
+    def _feed_string(self, char):
+        if self._unicode_digits:
+            self._unicode_digits -= 1
+        elif self._escape:
+            self._escape = False
+            if char == "u":
+                self._unicode_digits = 4
+        elif char == "\\":
+            self._escape = True
+            self._escape_start = len(self._raw)
+        elif char == '"':
+            self._in_string = False
+            text = self._decode()
+            if self._string_is_key:
+                self._stack[-1][1] = text
+            elif self._slot is None:
+                self._root = text
+            else:
+                container, key = self._slot
+                container[key] = text
+                self._slot = None
+            self._raw = []
+            return
+        self._raw.append(char)
+
+    def _feed_value(self, char):
+        if char in _WHITESPACE or char in ",:":
+            return
+        if char in "{[":
+            container = {} if char == "{" else []
+            self._attach(container)
+            self._stack.append([container, None])
+        elif char in "}]":
+            if self._stack:
+                self._stack.pop()
+        elif char == '"':
+            self._in_string = True
+            self._string_is_key = bool(self._stack) and isinstance(self._stack[-1][0], dict) and self._stack[-1][1] is None
+            if not self._string_is_key:
+                self._slot = self._attach("")
+        else:
+            self._literal.append(char)
+
+    def _end_literal(self):
+        text = "".join(self._literal)
+        self._literal = []
+        try:
+            self._attach(json.loads(text))
+        except json.JSONDecodeError:
+            pass
+
+    def _attach(self, value):
+        if not self._stack:
+            self._root = value
+            return None
+        frame = self._stack[-1]
+        container = frame[0]
+        if isinstance(container, list):
+            container.append(value)
+            return container, len(container) - 1
+        key = frame[1]
+        frame[1] = None
+        container[key] = value
+        return container, key
+
+    def _decode(self, partial=False):
+        raw = "".join(self._raw)
+        if partial and (self._escape or self._unicode_digits):
+            raw = raw[: self._escape_start]
+        text = json.loads(f'"{raw}"', strict=False)
+        if partial and text and "\ud800" <= text[-1] <= "\udbff":
+            # High surrogate whose low half has not arrived yet.
+            text = text[:-1]
+        return text
+
+
+class StreamedToolCall:
+    def __init__(self, index):
+        self.index = index
+        self.id = None
+        self.name = ""
+        self.arguments = ""
+        self._parser = PartialJSONParser()
+
+    def feed(self, arguments):
+        self.arguments += arguments
+        if self._parser is None:
+            return
+        try:
+            self._parser.feed(arguments)
+        except ValueError:
+            # Malformed arguments only lose the progressive preview, arguments_json() reports the error.
+            self._parser = None
+
+    def partial_arguments(self):
+        if self._parser is None:
+            return {}
+        try:
+            value = self._parser.value
+        except ValueError:
+            return {}
+        return value if isinstance(value, dict) else {}
+
+    def arguments_json(self):
+        return json.loads(self.arguments) if self.arguments else {}
+
+
+class ToolCallAccumulator:
+    """Collects ``tool_calls`` deltas from a streamed chat completion, keyed by call index."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def add(self, tool_call_deltas):
+        updated = []
+        for delta in tool_call_deltas:
+            call = self._calls.setdefault(delta.index, StreamedToolCall(delta.index))
+            if delta.id:
+                call.id = delta.id
+            function = delta.function
+            if function is not None:
+                if function.name:
+                    call.name += function.name
+                if function.arguments:
+                    call.feed(function.arguments)
+            updated.append(call)
+        return updated
+
+    def calls(self):
+        return [self._calls[index] for index in sorted(self._calls)]
+
+
+def dedupe_tool_calls(tool_calls):
+    """Drop repeated parallel calls of a tool, keeping the first; every knowledge graph update is kept."""
+    seen = set()
+    unique = []
+    for call in tool_calls:
+        if call.name in seen and call.name != "update_knowledge_graph":
+            logging.warning(f"Ignoring duplicate parallel {call.name} call: {call.arguments}")
+            continue
+        seen.add(call.name)
+        unique.append(call)
+    return unique